@@ -13,8 +13,8 @@ import numpy as np
 import pygmt
 import geopandas as gpd
 
-from utils.read import (read_yaml, read_stations, read_list, read_earthquakes,
-                        read_pb_plate_boundaries)
+from utils.read import (read_yaml, read_stations, read_list, read_catalogs,
+                        read_pb_plate_boundaries, MT_COMPONENTS)
 
 
 class BasedAlaska:
@@ -142,7 +142,8 @@ class BasedAlaska:
         # Read stations from specified file
         if self.cfg.FILES.stations:
             stations = read_stations(self.cfg.FILES.stations,
-                                     self.cfg.FORMATS.stations)
+                                     self.cfg.FORMATS.stations,
+                                     region=self._crop_region())
             if self.cfg.STATIONS.color_by == "network":
                 # We will need to temporarily overwrite the color parameter
                 # in kwargs
@@ -172,7 +173,15 @@ class BasedAlaska:
 
     def earthquakes(self, fid=None, fmt=None, mt=True, colorbar=True):
         """
-        Plot beachball moment tensors or focal mechanisms
+        Plot beachball moment tensors or focal mechanisms. All files given
+        are read concurrently and merged into a single catalog so that the
+        layer shares one colormap and is drawn with a single call
+
+        :type fid: str or list of str
+        :param fid: catalog file(s), defaults to the relevant FILES entry
+        :type fmt: str or list of str
+        :param fmt: format(s) for each file, defaults to the relevant FORMATS
+            entry
         """
         # Separate plotting parameters for earthquakes and moment tensors
         if mt:
@@ -190,12 +199,21 @@ class BasedAlaska:
             if fmt is None:
                 fmt = self.cfg.FORMATS.earthquakes
 
-        lats, lons, depths, mt_dict = read_earthquakes(fid=fid, fmt=fmt, mt=mt)
+        catalog = read_catalogs(
+            fids=fid, fmts=fmt, mt=mt,
+            time_tol=self.cfg.EARTHQUAKES.duplicate_time_tol,
+            loc_tol=self.cfg.EARTHQUAKES.duplicate_loc_tol,
+            region=self._crop_region()
+        )
+        lats = catalog.latitude.to_numpy()
+        lons = catalog.longitude.to_numpy()
+        depths = catalog.depth.to_numpy()
         if mt: 
             _print_val = "moment tensors"
         else:
             _print_val = "earthquakes"
-        print(f"{len(lats)} {_print_val} colored by "
+        print(f"{len(catalog)} {_print_val} from "
+              f"{catalog.source.nunique()} file(s) colored by "
               f"{self.cfg.EARTHQUAKES.color_by}")
 
         # Determine how to color the moment tensors
@@ -208,8 +226,9 @@ class BasedAlaska:
             )
         
         if mt:
-            self.f.meca(spec=mt_dict, latitude=lats, longitude=lons, 
-                        depth=depths, scale=self.cfg.MOMENT_TENSORS.scale,
+            self.f.meca(spec=catalog[MT_COMPONENTS], latitude=lats,
+                        longitude=lons, depth=depths,
+                        scale=self.cfg.MOMENT_TENSORS.scale,
                         C=self.cfg.FLAGS.colorbar,
                         L=self.cfg.PENS.moment_tensors,
                         **self.cfg.MOMENT_TENSORS.kwargs
@@ -219,6 +238,15 @@ class BasedAlaska:
                         cmap=self.cfg.FLAGS.colorbar,
                         **self.cfg.EARTHQUAKES.plot_kwargs)
 
+    def _crop_region(self):
+        """
+        Region used to drop stations and earthquakes while reading files, only
+        if requested, otherwise all data is read and GMT clips to the map
+        """
+        if self.cfg.FLAGS.crop_to_region:
+            return self.cfg.BASEMAP.region
+        return None
+
     def _plot_shapefile(self, fid, **kwargs):
         """
         Generic function to plot a Shapefile which has information about 
@@ -327,14 +355,7 @@ if __name__ == "__main__":
     ba.roads()
     ba.faults()
     ba.earthquakes(mt=False)
-    if isinstance(ba.cfg.FILES.moment_tensors, list):
-        for i, (fid, fmt) in enumerate(zip(ba.cfg.FILES.moment_tensors,
-                                           ba.cfg.FORMATS.moment_tensors)):
-            ba.earthquakes(fid, fmt, mt=True,
-                           colorbar=bool(i+1==len(ba.cfg.FILES.moment_tensors))
-                           )
-    else:
-        ba.earthquakes(mt=True)
+    ba.earthquakes(mt=True)
     ba.stations()
     ba.cities()
     ba.landmarks()
@@ -0,0 +1,180 @@
+"""
+Test the file reading functions in utils.read
+"""
+import os
+import numpy as np
+import pytest
+from obspy import read_events, UTCDateTime
+from obspy.core.event import Catalog, Event, Origin
+
+from utils.read import read_catalog, read_catalogs, read_stations
+
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "test_data")
+
+
+def _write_quakeml(fid, events):
+    """
+    Write a QuakeML file of (time, latitude, longitude, depth_km) events
+    """
+    cat = Catalog()
+    for time, lat, lon, depth in events:
+        origin = Origin(time=UTCDateTime(time), latitude=lat, longitude=lon,
+                        depth=depth * 1E3)
+        event = Event(origins=[origin])
+        event.preferred_origin_id = origin.resource_id
+        cat.append(event)
+    cat.write(fid, format="QUAKEML")
+    return fid
+
+
+def _write_gcmt(fid, events):
+    """
+    Write a psmeca file of (latitude, longitude, depth_km, name) events. If
+    name is None, the X, Y and name columns are left out
+    """
+    with open(fid, "w") as f:
+        for lat, lon, depth, name in events:
+            line = f"{lon} {lat} {depth} 1 -1 0 0 0 0 24"
+            if name is not None:
+                line += f" X Y {name}"
+            f.write(f"{line}\n")
+    return fid
+
+
+def test_read_catalogs_gcmt_quakeml_duplicate(tmp_path):
+    """
+    The same event written as a psmeca row should be matched against its
+    QuakeML counterpart even though GCMT only gives time to the minute
+    """
+    fid = os.path.join(TEST_DATA, "nalaska_moment_tensors.xml")
+    origin = read_events(fid)[0].preferred_origin()
+    name = f"C{origin.time.strftime('%Y%m%d%H%M')}A"
+    gcmt = _write_gcmt(tmp_path / "gcmt.txt",
+                       [(origin.latitude, origin.longitude,
+                         origin.depth * 1E-3, name)])
+
+    catalog = read_catalogs([fid, str(gcmt)], ["QUAKEML", "GCMT"])
+    assert(len(catalog) == len(read_catalog(fid, "QUAKEML")))
+    assert(set(catalog.source) == {fid})
+
+
+def test_read_catalogs_gcmt_wide_time_tol(tmp_path):
+    """
+    With a GCMT file in the merge, pairs whose minute-floored times are within
+    a tolerance larger than a minute should still be matched
+    """
+    gcmt = _write_gcmt(tmp_path / "gcmt.txt",
+                       [(65., -150., 10., "C202001010006A")])
+    quakeml = _write_quakeml(tmp_path / "events.xml",
+                             [("2020-01-01T00:08:30", 65., -150., 10.)])
+
+    catalog = read_catalogs([str(gcmt), str(quakeml)], ["GCMT", "QUAKEML"],
+                            mt=False, time_tol=130.)
+    assert(list(catalog.source) == [str(gcmt)])
+
+
+def test_read_catalogs_dateline(tmp_path):
+    """
+    Longitudes on either side of the dateline, or in the 0/360 convention,
+    should be compared modulo 360 when matching duplicates
+    """
+    first = _write_quakeml(tmp_path / "first.xml",
+                           [("2020-01-01T00:00:00", 52., 179.99, 10.)])
+    second = _write_quakeml(tmp_path / "second.xml",
+                            [("2020-01-01T00:00:01", 52., -180., 10.)])
+    third = _write_gcmt(tmp_path / "third.txt",
+                        [(52., 180.02, 10., "C202001010000A")])
+
+    catalog = read_catalogs([str(first), str(second), str(third)],
+                            ["QUAKEML", "QUAKEML", "GCMT"], mt=False)
+    assert(list(catalog.source) == [str(first)])
+
+
+def test_read_catalogs_duplicates(tmp_path):
+    """
+    Check that the duplicate join matches across bin edges, gives priority to
+    the first listed file and keeps events without origin times
+    """
+    first = _write_quakeml(tmp_path / "first.xml", [
+        ("2020-01-01T00:00:09.9", 65., -150., 10.),
+        ("2020-01-01T01:00:00", 66., -151., 10.),
+    ])
+    # First event is across a 10s bin edge, second is too far away in time
+    second = _write_quakeml(tmp_path / "second.xml", [
+        ("2020-01-01T00:00:10.1", 65.05, -150.05, 12.),
+        ("2020-01-01T01:00:30", 66., -151., 10.),
+    ])
+    # Unnamed psmeca rows have no origin time and should never be dropped
+    third = _write_gcmt(tmp_path / "third.txt", [(65., -150., 10., None)])
+
+    catalog = read_catalogs([str(first), str(second), str(third)],
+                            ["QUAKEML", "QUAKEML", "GCMT"], mt=False,
+                            time_tol=10., loc_tol=.1)
+    assert(len(catalog) == 4)
+    assert((catalog.source == str(first)).sum() == 2)
+    assert((catalog.source == str(second)).sum() == 1)
+    assert(catalog.time.isna().sum() == 1)
+    assert(catalog.depth[catalog.latitude == 65.05].empty)
+
+    # Reversing the file order flips which copy is kept
+    catalog = read_catalogs([str(second), str(first)], "QUAKEML", mt=False)
+    assert(65.05 in catalog.latitude.values)
+    assert(len(catalog) == 3)
+
+
+def test_read_catalogs_zero_time_tol(tmp_path):
+    """
+    A zero time tolerance only matches identical origin times
+    """
+    events = [("2020-01-01T00:00:00", 65., -150., 10.)]
+    first = _write_quakeml(tmp_path / "first.xml", events)
+    second = _write_quakeml(tmp_path / "second.xml", events)
+
+    catalog = read_catalogs([str(first), str(second)], "QUAKEML", mt=False,
+                            time_tol=0)
+    assert(len(catalog) == 1)
+
+
+@pytest.mark.parametrize("fid", [
+    os.path.join(TEST_DATA, "STATIONS_NALASKA"), "na_codes"
+])
+def test_read_stations_matches_loadtxt(tmp_path, fid):
+    """
+    The chunked SPECFEM reader should match np.loadtxt, including codes like
+    network 'NA' that Pandas would otherwise read as missing values
+    """
+    if fid == "na_codes":
+        fid = tmp_path / "STATIONS"
+        fid.write_text("ABC NA 65.0 -150.0 0.0 0.0\n"
+                       "NULL XX 66.0 -151.0 0.0 0.0\n")
+    data = np.loadtxt(fid, dtype=str, ndmin=2)
+    stations = read_stations(str(fid), "SPECFEM")
+
+    assert((stations.stations == data[:, 0]).all())
+    assert((stations.networks == data[:, 1]).all())
+    assert((stations.latitudes == data[:, 2].astype(float)).all())
+    assert((stations.longitudes == data[:, 3].astype(float)).all())
+
+
+def test_read_region(tmp_path):
+    """
+    Region filtering should work across longitude conventions and be skipped
+    for regions that are not four numbers
+    """
+    fid = tmp_path / "STATIONS"
+    fid.write_text("AAA AK 65.0 -144.48 0.0 0.0\n"
+                   "BBB AK 65.0 100.0 0.0 0.0\n")
+
+    for region in [[190, 220, 60, 72], [-170, -140, 60, 72]]:
+        stations = read_stations(str(fid), "SPECFEM", region=region)
+        assert(list(stations.stations) == ["AAA"])
+
+    for region in ["g", "-170/-140/60/72+r", None]:
+        stations = read_stations(str(fid), "SPECFEM", region=region)
+        assert(len(stations.stations) == 2)
+
+    gcmt = _write_gcmt(tmp_path / "gcmt.txt", [(65., -144.48, 10., None),
+                                                (65., 100., 10., None)])
+    catalog = read_catalog(str(gcmt), "GCMT", region=[190, 220, 60, 72])
+    assert(list(catalog.longitude) == [-144.48])
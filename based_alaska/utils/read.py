@@ -3,11 +3,17 @@ Function for reading the Yaml config file
 """
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from obspy import read_events
 import yaml
 
+
+# Moment tensor components in the order expected by pygmt.Figure.meca
+MT_COMPONENTS = ["mrr", "mtt", "mff", "mrt", "mrf", "mtf", "exponent"]
+
+
 class Dict(dict):
     """
     Small updated dictionary class which allows getting and setting keys as
@@ -37,7 +43,7 @@ def read_yaml(fid):
     return Dict(attrs)
 
 
-def read_stations(fid, fmt):
+def read_stations(fid, fmt, region=None):
     """
     A generic read stations file that is capable of reading a variety of
     input formats but always returns the same format expected by the main
@@ -47,6 +53,9 @@ def read_stations(fid, fmt):
     :param fid: file identifier
     :type fmt: str
     :param fmt: format
+    :type region: list of float
+    :param region: optional [lon_min, lon_max, lat_min, lat_max], stations
+        outside of this region are dropped while reading
     :rtype: dict
     :return: a dictionary of station information that can be accessed by the
         plotting script
@@ -57,68 +66,274 @@ def read_stations(fid, fmt):
     
     # Read in SPECFEM3D STATIONS file format 
     if fmt.upper() == "SPECFEM":
-        data = np.loadtxt(fid, dtype=str)
-        stations_dict.stations = data[:, 0]
-        stations_dict.networks = data[:, 1]
-        stations_dict.latitudes = data[:, 2].astype(float)
-        stations_dict.longitudes = data[:, 3].astype(float)
+        data = _read_columns(fid, columns={0: ("stations", str),
+                                           1: ("networks", str),
+                                           2: ("latitudes", float),
+                                           3: ("longitudes", float)},
+                             region=region, lat_lon=("latitudes", "longitudes")
+                             )
+        for key in data.columns:
+            stations_dict[key] = data[key].to_numpy()
     else:
         sys.exit(f"Unexpected format {fmt} for stations file")
 
     return stations_dict
 
 
-def read_earthquakes(fid, fmt, mt=True):
+def read_catalog(fid, fmt, mt=True, region=None):
     """
-    Read moment tensor information from disk
+    Read a single earthquake catalog into a columnar table so that every input
+    format ends up with the same columns
 
-    :rtype: list, list, list, Pandas.DataFrame
-    :return: lists and dataframe with earthquake information. 
-        If mt is False, then the dataframe will be empty
+    :type fid: str
+    :param fid: file identifier
+    :type fmt: str
+    :param fmt: format, 'GCMT' (psmeca) or 'QUAKEML'
+    :type mt: bool
+    :param mt: also read moment tensor components. Events without a moment
+        tensor are skipped
+    :type region: list of float
+    :param region: optional [lon_min, lon_max, lat_min, lat_max], events
+        outside of this region are dropped
+    :rtype: pandas.DataFrame
+    :return: one row per event with columns 'time', 'latitude', 'longitude',
+        'depth' and, if `mt`, the components listed in MT_COMPONENTS. 'time' is
+        NaT if the format does not provide an origin time
     """
-    mt_dict = Dict(mrr=[], mtt=[], mff=[], mrt=[], mrf=[], mtf=[], exponent=[])
+    columns = ["time", "latitude", "longitude", "depth"]
+    if mt:
+        columns += MT_COMPONENTS
 
     # Downloaded from GCMT in PSMECA format
     if fmt.upper() == "GCMT":
-        data = np.loadtxt(fid, dtype=str)
-        lons = data[:, 0].astype(float)
-        lats = data[:, 1].astype(float)
-        depths = data[:, 2].astype(float)
+        ncol = _count_columns(fid)
+        usecols = {0: ("longitude", float), 1: ("latitude", float),
+                   2: ("depth", float)}
         if mt:
-            mt_dict.mrr = data[:, 3].astype(float)
-            mt_dict.mtt = data[:, 4].astype(float)
-            mt_dict.mff = data[:, 5].astype(float)
-            mt_dict.mrt = data[:, 6].astype(float)
-            mt_dict.mrf = data[:, 7].astype(float)
-            mt_dict.mtf = data[:, 8].astype(float)
-            mt_dict.exponent = data[:, 9].astype(float)
+            for i, component in enumerate(MT_COMPONENTS):
+                usecols[3 + i] = (component, float)
+        # Event names (last column) encode origin time, e.g., C201501011234A
+        if ncol > 10:
+            usecols[ncol - 1] = ("time", str)
+            convert = {"time": _gcmt_origin_times}
+        else:
+            convert = None
+        table = _read_columns(fid, columns=usecols, region=region,
+                              convert=convert)
+        if "time" not in table:
+            table["time"] = pd.NaT
     # Downloaded from data center in QUAKML (.xml) format
     elif fmt.upper() == "QUAKEML":
-        lats, lons, depths = [], [], []
-        cat = read_events(fid)
-        for event in cat:
-            lats.append(event.preferred_origin().latitude)
-            lons.append(event.preferred_origin().longitude)
-            depths.append(event.preferred_origin().depth * 1E-3)  # m -> km
+        rows = []
+        for event in read_events(fid):
+            origin = event.preferred_origin()
+            row = [origin.time.datetime, origin.latitude, origin.longitude,
+                   origin.depth * 1E-3]  # m -> km
             if mt:
                 try:
-                    fm = Dict(
-                        event.preferred_focal_mechanism().moment_tensor.tensor
-                    )
+                    fm = event.preferred_focal_mechanism().moment_tensor.tensor
                 except AttributeError:
                     continue
-                mt_dict.mrr.append(fm.m_rr)
-                mt_dict.mtt.append(fm.m_tt)
-                mt_dict.mff.append(fm.m_pp)
-                mt_dict.mrt.append(fm.m_rt)
-                mt_dict.mrf.append(fm.m_rp)
-                mt_dict.mtf.append(fm.m_tp)
-                mt_dict.exponent.append(7)
-
-    # PyGMT.meca() plays nicer with Pandas Data Frames so convert before return
-    mt_dict = pd.DataFrame(mt_dict)
-
-    return lats, lons, depths, mt_dict
+                row += [fm.m_rr, fm.m_tt, fm.m_pp, fm.m_rt, fm.m_rp, fm.m_tp, 7]
+            rows.append(row)
+        table = pd.DataFrame(rows, columns=columns)
+        table["time"] = pd.to_datetime(table["time"])
+        if region is not None:
+            table = table[_in_region(table.latitude, table.longitude, region)]
+    else:
+        sys.exit(f"Unexpected format {fmt} for earthquake file")
+
+    return table[columns].reset_index(drop=True)
+
+
+def read_catalogs(fids, fmts, mt=True, time_tol=10., loc_tol=.1, nproc=None,
+                  region=None):
+    """
+    Read one or more earthquake catalogs of mixed formats concurrently and
+    merge them into a single table with a 'source' column noting the file each
+    event came from.
+
+    Events that show up in more than one catalog are resolved with a hash join
+    on binned origin time, keeping only matches within `time_tol` and
+    `loc_tol`. The first listed file takes priority. GCMT origin times are
+    only known to the minute, so pairs involving a GCMT event are compared on
+    times floored to the minute. Events without an origin time, e.g., GCMT
+    files without names or with old-style names like M010176A, are never
+    treated as duplicates and are always kept.
+
+    :type fids: str or list of str
+    :param fids: file identifier(s)
+    :type fmts: str or list of str
+    :param fmts: format for each file, or a single format for all files
+    :type mt: bool
+    :param mt: also read moment tensor components, see `read_catalog`
+    :type time_tol: float
+    :param time_tol: maximum origin time difference in seconds for two events
+        to be considered duplicates
+    :type loc_tol: float
+    :param loc_tol: maximum latitude and longitude difference in degrees for
+        two events to be considered duplicates
+    :type nproc: int
+    :param nproc: number of worker processes, defaults to one per file up to
+        the number of available CPUs
+    :type region: list of float
+    :param region: optional [lon_min, lon_max, lat_min, lat_max], events
+        outside of this region are dropped while reading
+    :rtype: pandas.DataFrame
+    :return: merged catalog with the columns of `read_catalog` plus 'source'
+    """
+    if isinstance(fids, str):
+        fids = [fids]
+    if isinstance(fmts, str):
+        fmts = [fmts] * len(fids)
+    assert(len(fids) == len(fmts)), \
+        f"{len(fids)} catalog files but {len(fmts)} formats given"
+
+    # QuakeML parsing is CPU bound so use processes rather than threads
+    if len(fids) == 1:
+        tables = [read_catalog(fids[0], fmts[0], mt=mt, region=region)]
+    else:
+        nproc = nproc or min(len(fids), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=nproc) as executor:
+            tables = list(executor.map(read_catalog, fids, fmts,
+                                       [mt] * len(fids),
+                                       [region] * len(fids)))
+
+    for fid, table in zip(fids, tables):
+        table["source"] = fid
+    catalog = pd.concat(tables, ignore_index=True)
+
+    if len(fids) > 1:
+        # Hash join on binned origin time, probing neighboring bins so that
+        # events straddling a bin edge still match, then check the actual
+        # time and location differences. Earlier files take priority
+        order = np.repeat(np.arange(len(tables)),
+                          [len(table) for table in tables])
+        times = catalog.time.to_numpy(dtype="datetime64[ns]").view("int64")
+        # GCMT names only give origin time to the minute, so any pair with a
+        # GCMT event is compared on minute-floored times. Raw times then differ
+        # by up to `time_tol` plus a minute, so bins are widened to match
+        minute = np.array([fmt.upper() == "GCMT" for fmt in fmts])[order]
+        bin_width = max(int(time_tol * 1E9), 1)
+        if minute.any():
+            bin_width = int((time_tol + 60) * 1E9)
+        keys = pd.DataFrame({
+            "bin": times // bin_width, "time": times,
+            "time_min": times // int(60 * 1E9) * int(60 * 1E9),
+            "minute": minute, "order": order,
+            "latitude": catalog.latitude, "longitude": catalog.longitude,
+        })[catalog.time.notna()]
+        keys["index"] = keys.index
+        duplicate = np.zeros(len(catalog), dtype=bool)
+        for shift in [-1, 0, 1]:
+            pairs = keys.merge(keys.assign(bin=keys.bin + shift), on="bin",
+                               suffixes=("", "_other"))
+            dt = np.where(pairs.minute | pairs.minute_other,
+                          pairs.time_min - pairs.time_min_other,
+                          pairs.time - pairs.time_other)
+            match = ((pairs.order_other < pairs.order) &
+                     (np.abs(dt) <= time_tol * 1E9) &
+                     ((pairs.latitude - pairs.latitude_other).abs() <=
+                      loc_tol) &
+                     (np.abs((pairs.longitude - pairs.longitude_other +
+                              180) % 360 - 180) <= loc_tol)
+                     )
+            duplicate[pairs["index"][match].to_numpy()] = True
+        if duplicate.any():
+            print(f"{duplicate.sum()} duplicate events removed from merged "
+                  f"catalog")
+        catalog = catalog[~duplicate].reset_index(drop=True)
+
+    return catalog
+
+
+def _count_columns(fid):
+    """
+    Count the whitespace-separated columns on the first data line of a file
+    """
+    with open(fid, "r") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                return len(line.split())
+    return 0
+
+
+def _in_region(lats, lons, region):
+    """
+    Boolean mask of points that fall within [lon_min, lon_max, lat_min,
+    lat_max]. Longitudes are compared modulo 360 so data and region may use
+    either the -180/180 or 0/360 convention, e.g., for maps across the
+    dateline. Regions that are not four numbers, such as GMT region strings
+    like 'g', are not filtered on
+    """
+    if isinstance(region, str):
+        return np.ones(len(lats), dtype=bool)
+    try:
+        lon_min, lon_max, lat_min, lat_max = [float(_) for _ in region]
+    except (TypeError, ValueError):
+        return np.ones(len(lats), dtype=bool)
+
+    span = lon_max - lon_min
+    if span >= 360:
+        in_lon = np.ones(len(lons), dtype=bool)
+    else:
+        in_lon = (lons - lon_min) % 360 <= span % 360
+
+    return in_lon & (lats >= lat_min) & (lats <= lat_max)
+
+
+def _gcmt_origin_times(names):
+    """
+    Parse origin times from GCMT event names, e.g., C201501011234A. Names that
+    do not contain a date are returned as NaT
+    """
+    return pd.to_datetime(names.str.extract(r"(\d{12})")[0],
+                          format="%Y%m%d%H%M", errors="coerce")
+
+
+def _read_columns(fid, columns, region=None, lat_lon=("latitude", "longitude"),
+                  convert=None, chunksize=100_000):
+    """
+    Stream a whitespace-delimited text file in chunks with Pandas' C parser.
+    Only the requested columns are parsed, straight to their final dtype, and
+    each chunk is filtered by `region` before the next one is read so that
+    the whole file is never held in memory as strings.
+
+    :type fid: str
+    :param fid: file identifier
+    :type columns: dict
+    :param columns: {column index: (name, dtype)} of the columns to read
+    :type region: list of float
+    :param region: optional [lon_min, lon_max, lat_min, lat_max] to filter on
+    :type lat_lon: tuple of str
+    :param lat_lon: names of the latitude and longitude columns for `region`
+    :type convert: dict
+    :param convert: {name: function} applied to a column of each chunk, e.g.,
+        to turn string columns into something smaller before they pile up
+    :type chunksize: int
+    :param chunksize: number of rows parsed at a time
+    :rtype: pandas.DataFrame
+    :return: the requested columns, in the order given, for all rows kept
+    """
+    names = {i: name for i, (name, _) in columns.items()}
+    chunks = []
+    # NA filtering is turned off so that codes like network 'NA' stay strings
+    reader = pd.read_csv(fid, sep=r"\s+", header=None, comment="#",
+                         engine="c", usecols=list(columns),
+                         dtype={i: dtype for i, (_, dtype) in columns.items()},
+                         keep_default_na=False, na_filter=False,
+                         chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            chunk = chunk.rename(columns=names)
+            if region is not None:
+                lat, lon = lat_lon
+                chunk = chunk[_in_region(chunk[lat], chunk[lon], region)]
+            for name, func in (convert or {}).items():
+                chunk = chunk.assign(**{name: func(chunk[name])})
+            chunks.append(chunk)
+
+    return pd.concat(chunks, ignore_index=True)[list(names.values())]
 
 
 def read_list(fid=None, dict_data=None, fmt=None):